@@ -0,0 +1,33 @@
+"""Process-wide loading of the verification code configuration."""
+
+import json
+import os
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def get_secret() -> bytes:
+    """Returns the secret key used to derive verification codes.
+
+    The key is read from the VERICODE_SECRET_KEY environment variable or, as a
+    fallback, from config.json. The result is cached, so config.json is read
+    at most once per process.
+
+    Returns:
+        The secret key, UTF-8 encoded.
+
+    Raises:
+        ValueError: If the key is set in neither location.
+    """
+
+    secret_key = os.environ.get("VERICODE_SECRET_KEY")
+    if not secret_key:
+        try:
+            with open("config.json", "r") as f:
+                secret_key = json.load(f).get("VERICODE_SECRET_KEY")
+        except FileNotFoundError:
+            pass # Handled by the next check
+
+    if not secret_key:
+        raise ValueError("VERICODE_SECRET_KEY not set in environment or config.json.")
+
+    return secret_key.encode("utf-8")
@@ -0,0 +1,26 @@
+"""Builds the optional _vericode_c extension with cffi.
+
+Run `python _vericode_build.py` from the project directory. It needs a C
+compiler and the OpenSSL development headers. When the extension is present,
+verification_code_generator uses it; otherwise it falls back to pure Python.
+"""
+
+import os
+
+from cffi import FFI
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+ffibuilder = FFI()
+ffibuilder.cdef("""
+    int vericode_init(const unsigned char *key, size_t key_len);
+    int vericode_gen(const unsigned char *msg, size_t msg_len,
+                     const unsigned char *charset, int charset_len,
+                     int per_lane, unsigned char *out, int length);
+""")
+
+with open(os.path.join(_HERE, "vericode.c"), "r") as f:
+    ffibuilder.set_source("_vericode_c", f.read(), libraries=["crypto"])
+
+if __name__ == "__main__":
+    ffibuilder.compile(tmpdir=_HERE, verbose=True)
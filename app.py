@@ -1,18 +1,13 @@
-import os
-import json
-from flask import Flask, render_template, request, jsonify
-import verification_code_generator
+import orjson
+from flask import Flask, Response, render_template, request
+from verification_code_generator import generate_code, validate_code
 
 app = Flask(__name__)
+# Request bodies only carry a user ID and a short code.
+app.config['MAX_CONTENT_LENGTH'] = 64 * 1024
 
-# Ensure config.json is loaded if not already handled by the library
-if not os.environ.get("VERICODE_SECRET_KEY"):
-    try:
-        with open("config.json", "r") as f:
-            config = json.load(f)
-            os.environ["VERICODE_SECRET_KEY"] = config.get("VERICODE_SECRET_KEY")
-    except Exception as e:
-        print(f"Warning: Could not load config.json: {e}")
+def _json_response(obj, status=200):
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')
 
 @app.route('/')
 def index():
@@ -20,32 +15,38 @@ def index():
 
 @app.route('/generate', methods=['POST'])
 def generate():
-    data = request.get_json()
+    try:
+        data = orjson.loads(request.get_data())
+    except orjson.JSONDecodeError:
+        return _json_response({'error': 'Request body must be valid JSON'}, 400)
     user_id = data.get('user_id')
 
     if not user_id:
-        return jsonify({'error': 'User ID is required'}), 400
+        return _json_response({'error': 'User ID is required'}, 400)
 
     try:
-        code = verification_code_generator.generate_code(user_id)
-        return jsonify({'code': code})
+        code = generate_code(user_id)
+        return _json_response({'code': code})
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _json_response({'error': str(e)}, 500)
 
 @app.route('/validate', methods=['POST'])
 def validate():
-    data = request.get_json()
+    try:
+        data = orjson.loads(request.get_data())
+    except orjson.JSONDecodeError:
+        return _json_response({'error': 'Request body must be valid JSON'}, 400)
     user_id = data.get('user_id')
     code = data.get('code')
 
     if not user_id or not code:
-        return jsonify({'error': 'User ID and Code are required'}), 400
+        return _json_response({'error': 'User ID and Code are required'}, 400)
 
     try:
-        is_valid = verification_code_generator.validate_code(code, user_id)
-        return jsonify({'valid': is_valid})
+        is_valid = validate_code(code, user_id)
+        return _json_response({'valid': is_valid})
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _json_response({'error': str(e)}, 500)
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    app.run(port=5000)
@@ -30,6 +30,18 @@ class TestApp(unittest.TestCase):
                                  content_type='application/json')
         self.assertEqual(response.status_code, 400)
 
+    def test_generate_code_invalid_json(self):
+        response = self.app.post('/generate',
+                                 data='not json',
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_validate_oversize_body(self):
+        response = self.app.post('/validate',
+                                 data=json.dumps({'user_id': 'x' * 100000, 'code': '123456'}),
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 413)
+
     def test_validate_code_success(self):
         user_id = 'test@example.com'
         # Generate code first
@@ -1,10 +1,29 @@
 """Tests for the verification_code_generator module.""" 
 
+import hmac 
+import itertools 
 import time 
 import unittest 
 from unittest.mock import patch 
 
-from verification_code_generator import generate_code, validate_code 
+import verification_code_generator 
+from verification_code_generator import ( 
+    SECRET_KEY, 
+    _cached_code_for_time_bucket, 
+    _code_from_digest, 
+    _generate_code_for_time_bucket, 
+    _hmac_sha256, 
+    _resolve_charset, 
+    generate_code, 
+    generate_codes_batch, 
+    validate_code, 
+) 
+
+ALL_CHARSETS = [ 
+    _resolve_charset(d, u, l) 
+    for d, u, l in itertools.product((False, True), repeat=3) 
+    if d or u or l 
+] 
 
 class TestVerificationCodeGenerator(unittest.TestCase): 
 
@@ -30,6 +49,36 @@ class TestVerificationCodeGenerator(unittest.TestCase):
         ) 
         self.assertTrue(code.isalnum()) 
 
+    def test_hmac_backend_matches_stdlib(self): 
+        """Test that the selected HMAC backend agrees with stdlib hmac.""" 
+        message = b"test@example.com:12345:" 
+        self.assertEqual( 
+            _hmac_sha256(message), 
+            hmac.new(SECRET_KEY, message, "sha256").digest(), 
+        ) 
+
+    def test_short_codes_use_first_eight_digest_bytes(self): 
+        """Test that single-lane codes ignore digest bytes past the first 8.""" 
+        digest = bytes(range(32)) 
+        truncated = digest[:8] + bytes(24) 
+        for charset in ALL_CHARSETS: 
+            self.assertEqual( 
+                _code_from_digest(digest, 8, charset), 
+                _code_from_digest(truncated, 8, charset), 
+            ) 
+
+    @unittest.skipIf(verification_code_generator._lib is None, "_vericode_c not built") 
+    def test_c_extension_matches_python(self): 
+        """Test that the C extension produces the pure-Python codes.""" 
+        for charset in ALL_CHARSETS: 
+            for length in range(1, 33): 
+                self.assertEqual( 
+                    _generate_code_for_time_bucket("c@example.com", 7, length, charset, 3), 
+                    _code_from_digest( 
+                        _hmac_sha256(b"c@example.com:7:3"), length, charset 
+                    ), 
+                ) 
+
     def test_generate_code_no_charset(self): 
         """Test that generation fails if no character set is selected.""" 
         with self.assertRaises(ValueError): 
@@ -40,12 +89,56 @@ class TestVerificationCodeGenerator(unittest.TestCase):
                 use_lowercase=False, 
             ) 
 
+    def test_generate_code_invalid_length(self): 
+        """Test that generation fails for lengths outside 1-32.""" 
+        for length in (0, 33): 
+            with self.assertRaises(ValueError): 
+                generate_code("test@example.com", length=length) 
+
+    def test_generate_codes_batch(self): 
+        """Test that batch generation matches per-user generation.""" 
+        user_ids = ["a@example.com", "b@example.com", "c@example.com"] 
+        codes = generate_codes_batch(user_ids, length=8, use_uppercase=True) 
+        self.assertEqual( 
+            codes, 
+            [generate_code(u, length=8, use_uppercase=True) for u in user_ids], 
+        ) 
+
+    def test_generate_code_cache(self): 
+        """Test that only generate_code with short user_ids is memoized.""" 
+        _cached_code_for_time_bucket.cache_clear() 
+        code = generate_code("cache@example.com") 
+        self.assertEqual(generate_code("cache@example.com"), code) 
+        info = _cached_code_for_time_bucket.cache_info() 
+        self.assertEqual((info.hits, info.currsize), (1, 1)) 
+
+        validate_code(code, "cache@example.com") 
+        validate_code("123456", "other@example.com") 
+        generate_code("x" * 1000) 
+        self.assertEqual(_cached_code_for_time_bucket.cache_info().currsize, 1) 
+
     def test_validate_code_success(self): 
         """Test successful validation within the same time period.""" 
         user_id = "validate@example.com" 
         code = generate_code(user_id) 
         self.assertTrue(validate_code(code, user_id)) 
 
+    @patch("verification_code_generator.time.time_ns") 
+    def test_validate_code_time_buckets(self, mock_time_ns): 
+        """Test that the previous bucket is accepted and older ones are not.""" 
+        user_id = "buckets@example.com" 
+        period_ns = 300 * 1_000_000_000 
+        start = 1000 * period_ns + period_ns - 1 # Last ns of bucket 1000 
+        mock_time_ns.return_value = start 
+        code = generate_code(user_id) 
+        self.assertTrue(validate_code(code, user_id)) 
+
+        mock_time_ns.return_value = start + 1 # First ns of bucket 1001 
+        self.assertTrue(validate_code(code, user_id)) 
+
+        mock_time_ns.return_value = start + 1 + period_ns # Bucket 1002 
+        self.assertFalse(validate_code(code, user_id)) 
+
     def test_validate_code_failure_wrong_code(self): 
         """Test validation failure with an incorrect code.""" 
         user_id = "validate@example.com" 
@@ -58,6 +151,14 @@ class TestVerificationCodeGenerator(unittest.TestCase):
         code = generate_code(user_id, use_uppercase=True) 
         self.assertFalse(validate_code(code, user_id, use_uppercase=False)) 
 
+    def test_validate_code_failure_invalid_input(self): 
+        """Test that malformed codes are rejected.""" 
+        user_id = "validate@example.com" 
+        self.assertFalse(validate_code("12a456", user_id)) 
+        self.assertFalse(validate_code("1" * 33, user_id)) 
+        self.assertFalse(validate_code("", user_id)) 
+        self.assertFalse(validate_code(None, user_id)) 
+
      
 
 if __name__ == "__main__": 
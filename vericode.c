@@ -0,0 +1,125 @@
+/*
+ * HMAC-SHA256 and charset mapping for verification codes, compiled into the
+ * optional _vericode_c extension by _vericode_build.py.
+ *
+ * The keyed HMAC state is built once by vericode_init and duplicated for each
+ * code, so the key pads are not re-hashed per call. The charset mapping must
+ * stay identical to the pure-Python path in verification_code_generator.py.
+ */
+
+#include <stddef.h>
+#include <stdint.h>
+
+#include <openssl/evp.h>
+#include <openssl/opensslv.h>
+
+#if OPENSSL_VERSION_NUMBER >= 0x30000000L
+#include <openssl/core_names.h>
+#include <openssl/params.h>
+
+static EVP_MAC_CTX *template_ctx = NULL;
+
+static int vericode_init(const unsigned char *key, size_t key_len)
+{
+    EVP_MAC *mac;
+    OSSL_PARAM params[2];
+
+    mac = EVP_MAC_fetch(NULL, "HMAC", NULL);
+    if (mac == NULL) {
+        return 0;
+    }
+    EVP_MAC_CTX_free(template_ctx);
+    template_ctx = EVP_MAC_CTX_new(mac);
+    EVP_MAC_free(mac);
+    if (template_ctx == NULL) {
+        return 0;
+    }
+
+    params[0] = OSSL_PARAM_construct_utf8_string(
+        OSSL_MAC_PARAM_DIGEST, "SHA256", 0);
+    params[1] = OSSL_PARAM_construct_end();
+    return EVP_MAC_init(template_ctx, key, key_len, params);
+}
+
+static int hmac_sha256(const unsigned char *msg, size_t msg_len,
+                       unsigned char digest[32])
+{
+    EVP_MAC_CTX *ctx;
+    size_t digest_len;
+    int ok;
+
+    if (template_ctx == NULL || (ctx = EVP_MAC_CTX_dup(template_ctx)) == NULL) {
+        return 0;
+    }
+    ok = EVP_MAC_update(ctx, msg, msg_len)
+        && EVP_MAC_final(ctx, digest, &digest_len, 32)
+        && digest_len == 32;
+    EVP_MAC_CTX_free(ctx);
+    return ok;
+}
+
+#else
+#include <openssl/hmac.h>
+
+static HMAC_CTX *template_ctx = NULL;
+
+static int vericode_init(const unsigned char *key, size_t key_len)
+{
+    HMAC_CTX_free(template_ctx);
+    template_ctx = HMAC_CTX_new();
+    if (template_ctx == NULL) {
+        return 0;
+    }
+    return HMAC_Init_ex(template_ctx, key, (int)key_len, EVP_sha256(), NULL);
+}
+
+static int hmac_sha256(const unsigned char *msg, size_t msg_len,
+                       unsigned char digest[32])
+{
+    HMAC_CTX *ctx;
+    unsigned int digest_len;
+    int ok;
+
+    if (template_ctx == NULL || (ctx = HMAC_CTX_new()) == NULL) {
+        return 0;
+    }
+    ok = HMAC_CTX_copy(ctx, template_ctx)
+        && HMAC_Update(ctx, msg, msg_len)
+        && HMAC_Final(ctx, digest, &digest_len)
+        && digest_len == 32;
+    HMAC_CTX_free(ctx);
+    return ok;
+}
+#endif
+
+/*
+ * Writes `length` characters of the code for `msg` to `out`. The digest is
+ * read as four big-endian 64-bit lanes, each yielding `per_lane` characters.
+ * Returns 1 on success and 0 on failure.
+ */
+static int vericode_gen(const unsigned char *msg, size_t msg_len,
+                        const unsigned char *charset, int charset_len,
+                        int per_lane, unsigned char *out, int length)
+{
+    unsigned char digest[32];
+    uint64_t num = 0;
+    int i, j;
+
+    if (charset_len <= 0 || per_lane <= 0 || length < 0
+            || length > 4 * per_lane || !hmac_sha256(msg, msg_len, digest)) {
+        return 0;
+    }
+
+    for (i = 0; i < length; i++) {
+        if (i % per_lane == 0) {
+            const unsigned char *lane = digest + 8 * (i / per_lane);
+            num = 0;
+            for (j = 0; j < 8; j++) {
+                num = (num << 8) | lane[j];
+            }
+        }
+        out[i] = charset[num % (uint64_t)charset_len];
+        num /= (uint64_t)charset_len;
+    }
+    return 1;
+}
@@ -1,47 +1,180 @@
 """A module for generating and validating stateless, time-bound verification codes."""
 
-import hashlib
 import hmac
+import itertools
 import string
+import struct
 import time
-from typing import Optional
+from functools import lru_cache
+from typing import List, Optional
+
+from _config import get_secret
+
+# Optional C extension doing HMAC and charset mapping in one call; see
+# _vericode_build.py.
+try:
+    from _vericode_c import ffi as _ffi, lib as _lib
+except ImportError:
+    _lib = None
+
+try:
+    from cryptography.hazmat.primitives import hashes as _hashes
+    from cryptography.hazmat.primitives import hmac as _c_hmac
+except ImportError:
+    _c_hmac = None
+
+# HMAC-SHA256 must run on OpenSSL, which dispatches to the SHA extensions
+# (SHA-NI) or AVX2 where the CPU provides them. CPython's builtin _sha256
+# fallback is several times slower, so refuse to run without OpenSSL.
+try:
+    from _hashlib import openssl_sha256 as _sha256
+except ImportError as e:
+    raise ImportError(
+        "Python must be built against OpenSSL >= 1.1.1 to provide SHA-256."
+    ) from e
 
 # For production use, this should be loaded securely, e.g., from an environment
 # variable or a secrets management system. It should not be hardcoded.
-import os
-import json
+SECRET_KEY = get_secret()
+
+# The keyed HMAC state is built once; each code generation clones it so the
+# inner and outer key pads are not re-hashed on every call. The cryptography
+# package binds OpenSSL's HMAC with less per-call overhead than the stdlib
+# hmac module, so it is preferred when installed.
+if _c_hmac is not None:
+    _HMAC_TEMPLATE = _c_hmac.HMAC(SECRET_KEY, _hashes.SHA256())
+
+    def _hmac_sha256(message: bytes) -> bytes:
+        mac = _HMAC_TEMPLATE.copy()
+        mac.update(message)
+        return mac.finalize()
+else:
+    _HMAC_TEMPLATE = hmac.new(SECRET_KEY, b"", _sha256)
+
+    def _hmac_sha256(message: bytes) -> bytes:
+        mac = _HMAC_TEMPLATE.copy()
+        mac.update(message)
+        return mac.digest()
+
+if _lib is not None and not _lib.vericode_init(SECRET_KEY, len(SECRET_KEY)):
+    raise RuntimeError("Failed to initialize the _vericode_c HMAC context.")
+
+_DIGITS = string.digits.encode("ascii")
+_UPPER = string.ascii_uppercase.encode("ascii")
+_LOWER = string.ascii_lowercase.encode("ascii")
+
+@lru_cache(maxsize=8)
+def _resolve_charset(
+    use_digits: bool, use_uppercase: bool, use_lowercase: bool
+) -> bytes:
+    """Returns the charset for a flag combination; there are at most eight.
 
-SECRET_KEY = os.environ.get("VERICODE_SECRET_KEY")
-if not SECRET_KEY:
-    try:
-        with open("config.json", "r") as f:
-            config = json.load(f)
-            SECRET_KEY = config.get("VERICODE_SECRET_KEY")
-    except FileNotFoundError:
-        pass # Handled by the next check
+    Raises:
+        ValueError: If no character set is selected.
+    """
+    charset = (
+        (_DIGITS if use_digits else b"")
+        + (_UPPER if use_uppercase else b"")
+        + (_LOWER if use_lowercase else b"")
+    )
+    if not charset:
+        raise ValueError("At least one character set must be selected.")
+    return charset
+
+# The 32-byte digest is read as four big-endian 64-bit lanes, so character
+# selection works on native-sized ints instead of one 256-bit integer.
+_DIGEST_LANES = struct.Struct(">4Q")
+
+def _chars_per_lane(n: int) -> int:
+    """Returns how many characters of an n-symbol charset one lane yields.
 
-if not SECRET_KEY:
-    raise ValueError("VERICODE_SECRET_KEY not set in environment or config.json.")
+    At least 16 bits of each lane are left unconsumed, which keeps the last
+    character drawn from a lane close to uniformly distributed.
+    """
+    k = 0
+    while n ** (k + 1) <= 1 << 48:
+        k += 1
+    return k
+
+_CHARS_PER_LANE = {
+    n: _chars_per_lane(n)
+    for n in {
+        len(_resolve_charset(d, u, l))
+        for d, u, l in itertools.product((False, True), repeat=3)
+        if d or u or l
+    }
+}
+
+# Four lanes hold at least 32 characters for every charset above.
+_MAX_CODE_LENGTH = 32
+
+# Codes returned by generate_code are memoized per (user_id, time_bucket,
+# length, charset, counter). The bucket is part of the key, so entries from
+# past periods are never hit again and simply age out of the LRU. Validation
+# is never cached, and neither are long user_ids, so callers cannot pin
+# arbitrary amounts of memory through the cache.
+_CODE_CACHE_SIZE = 10_000
+_MAX_CACHED_USER_ID_LENGTH = 256
+
+def _is_ascii_digits(s: str) -> bool:
+    """Returns True if s is non-empty and made only of the digits 0-9.
+
+    Unlike str.isdigit, this rejects other Unicode digits such as "²" that
+    int() cannot parse.
+    """
+    return bool(s) and not s.encode("utf-8").translate(None, _DIGITS)
 
 def _generate_code_for_time_bucket(
     user_id: str,
     time_bucket: int,
     length: int,
-    charset: str,
+    charset: bytes,
     counter: Optional[int] = None,
-) -> str:
+) -> bytes:
     """Helper function to generate a code for a specific time bucket."""
-    message = f"{user_id}:{time_bucket}:{counter}:{SECRET_KEY}"
-    h = hashlib.sha256(message.encode("utf-8")).digest()
-    num = int.from_bytes(h, "big")
-
-    code = []
-    for _ in range(length):
-        index = num % len(charset)
-        code.append(charset[index])
-        num >>= 3
-
-    return "".join(code)
+    message = b"%b:%d:%b" % (
+        user_id.encode("utf-8"),
+        time_bucket,
+        b"" if counter is None else b"%d" % counter,
+    )
+    if _lib is not None:
+        code = _ffi.new("unsigned char[]", length)
+        if not _lib.vericode_gen(
+            message, len(message), charset, len(charset),
+            _CHARS_PER_LANE[len(charset)], code, length,
+        ):
+            raise RuntimeError("_vericode_c failed to generate a code.")
+        return _ffi.buffer(code)[:]
+    return _code_from_digest(_hmac_sha256(message), length, charset)
+
+_cached_code_for_time_bucket = lru_cache(maxsize=_CODE_CACHE_SIZE)(
+    _generate_code_for_time_bucket
+)
+
+def _code_from_digest(h: bytes, length: int, charset: bytes) -> bytes:
+    """Maps an HMAC-SHA256 digest to `length` characters of the charset."""
+    # Characters are drawn from one lane until it has yielded its share, then
+    # from the next one. Codes that fit in one lane, which covers the usual
+    # 6-8 character codes, therefore depend only on the first 8 bytes of the
+    # digest.
+    lanes = _DIGEST_LANES.unpack(h)
+    n = len(charset)
+    per_lane = _CHARS_PER_LANE[n]
+    if charset == _DIGITS and length <= per_lane:
+        # For digits the divmod loop below yields the base-10 representation
+        # of the lane, least significant digit first, so let int formatting
+        # do the work in C instead.
+        return (b"%0*d" % (length, lanes[0] % 10 ** length))[::-1]
+
+    code = bytearray(length)
+    num = 0
+    for i in range(length):
+        if i % per_lane == 0:
+            num = lanes[i // per_lane]
+        num, index = divmod(num, n)
+        code[i] = charset[index]
+
+    return bytes(code)
 
 def generate_code(
     user_id: str,
@@ -70,24 +203,70 @@ def generate_code(
         The generated code.
 
     Raises:
-        ValueError: If no character set is selected.
+        ValueError: If no character set is selected, or the length is not
+            between 1 and 32.
     """
 
-    charset = ""
-    if use_digits:
-        charset += string.digits
-    if use_uppercase:
-        charset += string.ascii_uppercase
-    if use_lowercase:
-        charset += string.ascii_lowercase
+    charset = _resolve_charset(use_digits, use_uppercase, use_lowercase)
+    if not 1 <= length <= _MAX_CODE_LENGTH:
+        raise ValueError(
+            f"Code length must be between 1 and {_MAX_CODE_LENGTH}."
+        )
+
+    current_time_bucket = time.time_ns() // (period * 1_000_000_000)
+    if len(user_id) <= _MAX_CACHED_USER_ID_LENGTH:
+        generate = _cached_code_for_time_bucket
+    else:
+        generate = _generate_code_for_time_bucket
+    return generate(
+        user_id, current_time_bucket, length, charset, counter
+    ).decode("ascii")
 
-    if not charset:
-        raise ValueError("At least one character set must be selected.")
+def generate_codes_batch(
+    user_ids: List[str],
+    period: int = 300,
+    length: int = 6,
+    use_digits: bool = True,
+    use_uppercase: bool = False,
+    use_lowercase: bool = False,
+    counter: Optional[int] = None,
+) -> List[str]:
+    """Generates the current verification codes for many users at once.
 
-    current_time_bucket = int(time.time() / period)
-    return _generate_code_for_time_bucket(
-        user_id, current_time_bucket, length, charset, counter
-    )
+    Each code is identical to what generate_code would return for the same
+    user_id and settings. The charset, length check and time bucket are
+    resolved once for the whole batch, which suits bulk uses such as admin
+    dashboards listing many users' current codes.
+
+    Args:
+        user_ids: The users' unique identifiers.
+        period: The validity period of the codes in seconds (default: 300s).
+        length: The desired length of each verification code.
+        use_digits: Whether to include numeric digits in the character set.
+        use_uppercase: Whether to include uppercase letters.
+        use_lowercase: Whether to include lowercase letters.
+
+    Returns:
+        The generated codes, in the same order as user_ids.
+
+    Raises:
+        ValueError: If no character set is selected, or the length is not
+            between 1 and 32.
+    """
+
+    charset = _resolve_charset(use_digits, use_uppercase, use_lowercase)
+    if not 1 <= length <= _MAX_CODE_LENGTH:
+        raise ValueError(
+            f"Code length must be between 1 and {_MAX_CODE_LENGTH}."
+        )
+
+    current_time_bucket = time.time_ns() // (period * 1_000_000_000)
+    return [
+        _generate_code_for_time_bucket(
+            user_id, current_time_bucket, length, charset, counter
+        ).decode("ascii")
+        for user_id in user_ids
+    ]
 
 def validate_code(
     code: str,
@@ -115,38 +294,36 @@ def validate_code(
         True if the code is valid, False otherwise.
     """
 
-    if not code:
+    if not code or len(code) > _MAX_CODE_LENGTH:
         return False
 
-    charset = ""
-    if use_digits:
-        charset += string.digits
-    if use_uppercase:
-        charset += string.ascii_uppercase
-    if use_lowercase:
-        charset += string.ascii_lowercase
-
-    if not charset:
+    try:
+        charset = _resolve_charset(use_digits, use_uppercase, use_lowercase)
+    except ValueError:
         return False # Or raise ValueError, consistent with generate_code
 
-    current_time_bucket = int(time.time() / period)
+    # A code containing characters outside the charset can never match, so
+    # reject it before doing any hashing. Deleting every charset byte leaves
+    # something behind exactly when such a character is present.
+    code_bytes = code.encode("utf-8")
+    if code_bytes.translate(None, charset):
+        return False
+
+    current_time_bucket = time.time_ns() // (period * 1_000_000_000)
     previous_time_bucket = current_time_bucket - 1
 
-    # Check current time bucket
     expected_code_current = _generate_code_for_time_bucket(
         user_id, current_time_bucket, len(code), charset, counter
     )
-    if hmac.compare_digest(code, expected_code_current):
-        return True
-
-    # Check previous time bucket
     expected_code_previous = _generate_code_for_time_bucket(
         user_id, previous_time_bucket, len(code), charset, counter
     )
-    if hmac.compare_digest(code, expected_code_previous):
-        return True
 
-    return False
+    # Both buckets are always compared so the response time does not reveal
+    # which one matched.
+    matches_current = hmac.compare_digest(code_bytes, expected_code_current)
+    matches_previous = hmac.compare_digest(code_bytes, expected_code_previous)
+    return matches_current | matches_previous
 
 if __name__ == "__main__":
     while True:
@@ -159,13 +336,13 @@ if __name__ == "__main__":
         if choice == '1':
             user_id = input("Enter User ID: ")
             length_str = input("Enter code length (default: 6): ")
-            length = int(length_str) if length_str.isdigit() else 6
+            length = int(length_str) if _is_ascii_digits(length_str) else 6
 
             use_digits = input("Use digits (0-9)? (y/n, default: y): ").lower() != 'n'
             use_uppercase = input("Use uppercase (A-Z)? (y/n, default: n): ").lower() == 'y'
             use_lowercase = input("Use lowercase (a-z)? (y/n, default: n): ").lower() == 'y'
             counter_str = input("Enter optional counter (integer, leave blank for none): ")
-            counter = int(counter_str) if counter_str.isdigit() else None
+            counter = int(counter_str) if _is_ascii_digits(counter_str) else None
 
             try:
                 code = generate_code(
@@ -190,7 +367,7 @@ if __name__ == "__main__":
             use_uppercase = input("Was it generated with uppercase? (y/n, default: n): ").lower() == 'y'
             use_lowercase = input("Was it generated with lowercase? (y/n, default: n): ").lower() == 'y'
             counter_str = input("Was a counter used? (integer, leave blank for none): ")
-            counter = int(counter_str) if counter_str.isdigit() else None
+            counter = int(counter_str) if _is_ascii_digits(counter_str) else None
 
             is_valid = validate_code(
                 code,
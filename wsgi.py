@@ -0,0 +1,3 @@
+"""WSGI entry point for running the demo app under a production server."""
+
+from app import app